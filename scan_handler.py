@@ -7,12 +7,19 @@ import os
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+# Scan mode: package logger is a no-op, structlog is never imported.
+# Only when run as a script; importing this module leaves the host's logging alone.
+if __name__ == "__main__":
+    os.environ.setdefault("POLYMARKET_SCAN_MODE", "1")
+
 from src.api_client import PolymarketClient
 from src.arbitrage_detector import ArbitrageDetector
+from src.report import render_summary
 
 
 async def run_scan() -> str:
     """Run scan and return report"""
+    # Per-call client: pooled connections can't outlive this run's event loop
     client = PolymarketClient()
     detector = ArbitrageDetector(client)
     
@@ -24,22 +31,9 @@ async def run_scan() -> str:
         
         opportunities = await detector.full_scan(markets)
         
-        if not opportunities:
-            return f"✅ 扫描完成: 检查了 {len(markets)} 个市场，未发现套利机会"
-        
-        # Format results
-        report = f"🔍 *Polymarket 套利扫描*\n"
-        report += f"扫描市场: {len(markets)}\n"
-        report += f"发现机会: {len(opportunities)}\n\n"
-        
-        for i, opp in enumerate(opportunities[:5], 1):
-            report += f"{i}. *{opp.type.value}*\n"
-            report += f"   预估收益: {opp.prop_estimate:.2%}\n"
-            report += f"   {opp.markets[0].question[:50]}...\n\n"
-        
-        return report
+        return render_summary(markets, opportunities)
 
 
 if __name__ == "__main__":
     result = asyncio.run(run_scan())
-    print(result)
+    sys.stdout.write(result + "\n")
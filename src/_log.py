@@ -0,0 +1,25 @@
+"""
+Package logger - no-op in scan mode so cron runs skip structlog entirely
+"""
+import os
+
+
+class _NullLogger:
+    """Stands in for the structlog logger methods this package calls"""
+    
+    def _noop(self, *args, **kwargs):
+        pass
+    
+    debug = info = warning = error = critical = exception = _noop
+
+
+def _scan_mode() -> bool:
+    # Set explicitly by the scan scripts; quiet monitor runs use --quiet
+    return os.getenv("POLYMARKET_SCAN_MODE") == "1"
+
+
+if _scan_mode():
+    logger = _NullLogger()
+else:
+    import structlog
+    logger = structlog.get_logger()
@@ -3,19 +3,16 @@ Polymarket API Client
 """
 import asyncio
 import aiohttp
-import sys
-from typing import List, Dict, Optional
-import logging
-import structlog
+import orjson
+import os
+import time
+from typing import Awaitable, Callable, List, Dict, Optional, Tuple, TypeVar
 
+from ._log import logger
 from .config import config
 from .models import Market, OrderBook, MarketStatus
 
-# Suppress noisy logs in scan mode
-if not sys.stdout.isatty():
-    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.CRITICAL))
-
-logger = structlog.get_logger()
+T = TypeVar("T")
 
 
 class PolymarketClient:
@@ -23,8 +20,13 @@ class PolymarketClient:
     
     def __init__(self):
         self.session: Optional[aiohttp.ClientSession] = None
-        self._markets_cache: List[Market] = []
-        self._cache_time: float = 0
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+        # TTL caches: key -> (timestamp, payload)
+        self._markets_cache: Dict[tuple, Tuple[float, List[Market]]] = {}
+        self._details_cache: Dict[str, Tuple[float, Dict]] = {}
+        self._load_details_cache()
+        # Identical requests already on the wire, shared by concurrent callers
+        self._inflight: Dict[tuple, asyncio.Future] = {}
     
     async def __aenter__(self):
         await self._ensure_session()
@@ -34,14 +36,96 @@ class PolymarketClient:
         await self.close()
     
     async def _ensure_session(self):
+        loop = asyncio.get_running_loop()
+        
+        # A session is bound to the loop it was created on. It can't be closed
+        # from another loop, so refuse to drop it (that leaks its sockets)
+        if self.session is not None and not self.session.closed and self._session_loop is not loop:
+            raise RuntimeError(
+                "PolymarketClient session belongs to another event loop; "
+                "call close() before that loop exits"
+            )
+        
         if self.session is None or self.session.closed:
             timeout = aiohttp.ClientTimeout(total=config.REQUEST_TIMEOUT)
-            self.session = aiohttp.ClientSession(timeout=timeout)
+            connector = aiohttp.TCPConnector(
+                limit=config.CONNECTION_LIMIT,
+                limit_per_host=config.CONNECTION_LIMIT_PER_HOST,
+                keepalive_timeout=config.KEEPALIVE_TIMEOUT,
+                ttl_dns_cache=config.DNS_CACHE_TTL,
+            )
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=timeout,
+                headers={"Accept-Encoding": "gzip, deflate"},
+            )
+            self._session_loop = loop
     
     async def close(self):
+        self._save_details_cache()
         if self.session and not self.session.closed:
             await self.session.close()
     
+    def _load_details_cache(self):
+        """Load persisted market details (cron runs are separate processes)"""
+        path = config.DETAILS_CACHE_FILE
+        if not path or not os.path.exists(path):
+            return
+        
+        try:
+            # Whole file is stale, skip parsing it
+            if time.time() - os.path.getmtime(path) >= config.CACHE_TTL_DETAILS:
+                return
+            with open(path, "rb") as f:
+                raw = orjson.loads(f.read())
+        except (OSError, ValueError) as e:
+            logger.warning("details_cache_load_failed", path=path, error=str(e))
+            return
+        
+        if not isinstance(raw, dict):
+            logger.warning("details_cache_load_failed", path=path, error="not a JSON object")
+            return
+        
+        # Keep only well-formed [timestamp, details] entries
+        self._details_cache = {
+            k: (float(v[0]), v[1]) for k, v in raw.items()
+            if isinstance(v, list) and len(v) == 2
+            and isinstance(v[0], (int, float)) and isinstance(v[1], dict)
+        }
+    
+    def _save_details_cache(self):
+        path = config.DETAILS_CACHE_FILE
+        if not path or not self._details_cache:
+            return
+        
+        now = time.time()
+        fresh = {
+            k: v for k, v in self._details_cache.items()
+            if now - v[0] < config.CACHE_TTL_DETAILS
+        }
+        
+        # Write-then-rename so concurrent cron runs never read a partial file
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                f.write(orjson.dumps(fresh))
+            os.replace(tmp, path)
+        except (OSError, TypeError) as e:
+            logger.warning("details_cache_save_failed", path=path, error=str(e))
+            if os.path.exists(tmp):
+                os.remove(tmp)
+    
+    async def _coalesce(self, key: tuple, fetch: Callable[[], Awaitable[T]]) -> T:
+        """Run fetch() once for concurrent callers asking for the same key"""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fetch())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        
+        # Shield so one caller being cancelled doesn't cancel the others
+        return await asyncio.shield(task)
+    
     async def get_markets(
         self,
         limit: int = 100,
@@ -50,6 +134,24 @@ class PolymarketClient:
         volume_min: Optional[float] = None,
     ) -> List[Market]:
         """Fetch markets from Gamma API"""
+        key = (limit, offset, closed, volume_min)
+        cached = self._markets_cache.get(key)
+        if cached and time.monotonic() - cached[0] < config.CACHE_TTL_MARKETS:
+            return list(cached[1])
+        
+        markets = await self._coalesce(
+            ("markets",) + key,
+            lambda: self._fetch_markets(limit, offset, closed, volume_min),
+        )
+        return list(markets)
+    
+    async def _fetch_markets(
+        self,
+        limit: int,
+        offset: int,
+        closed: bool,
+        volume_min: Optional[float],
+    ) -> List[Market]:
         params = {
             "limit": limit,
             "offset": offset,
@@ -69,7 +171,7 @@ class PolymarketClient:
                     logger.warning("api_error", status=resp.status, url=url)
                     return []
                 
-                data = await resp.json()
+                data = orjson.loads(await resp.read())
                 markets = [Market.from_api_response(m) for m in data]
                 
                 # Filter to active markets with enough volume
@@ -80,6 +182,8 @@ class PolymarketClient:
                 ]
                 
                 logger.info("markets_fetched", count=len(markets))
+                key = (limit, offset, closed, volume_min)
+                self._markets_cache[key] = (time.monotonic(), markets)
                 return markets
                 
         except asyncio.TimeoutError:
@@ -98,13 +202,9 @@ class PolymarketClient:
                 if resp.status != 200:
                     return None
                 
-                data = await resp.json()
+                data = orjson.loads(await resp.read())
                 
-                return OrderBook(
-                    token_id=token_id,
-                    bids=data.get("bids", []),
-                    asks=data.get("asks", []),
-                )
+                return OrderBook.from_clob(token_id, data)
                 
         except Exception as e:
             logger.warning("orderbook_fetch_failed", token_id=token_id, error=str(e))
@@ -124,7 +224,7 @@ class PolymarketClient:
                 if resp.status != 200:
                     return {}
                 
-                data = await resp.json()
+                data = orjson.loads(await resp.read())
                 return {item["token_id"]: float(item["price"]) for item in data}
                 
         except Exception as e:
@@ -144,7 +244,7 @@ class PolymarketClient:
                 if resp.status != 200:
                     return {}
                 
-                data = await resp.json()
+                data = orjson.loads(await resp.read())
                 return {item["token_id"]: float(item["price"]) for item in data}
                 
         except Exception as e:
@@ -164,15 +264,37 @@ class PolymarketClient:
                 if resp.status != 200:
                     return {}
                 
-                data = await resp.json()
+                data = orjson.loads(await resp.read())
                 return {item["token_id"]: float(item["spread"]) for item in data}
                 
         except Exception as e:
             logger.warning("spreads_fetch_failed", error=str(e))
             return {}
     
+    async def get_prices_midpoints_spreads(
+        self, token_ids: List[str]
+    ) -> Dict[str, Dict[str, float]]:
+        """Fetch prices, midpoints and spreads concurrently (one RTT, not three)"""
+        prices, midpoints, spreads = await asyncio.gather(
+            self.get_prices(token_ids),
+            self.get_midpoints(token_ids),
+            self.get_spreads(token_ids),
+        )
+        return {"prices": prices, "midpoints": midpoints, "spreads": spreads}
+    
     async def get_market_details(self, market_id: str) -> Optional[Dict]:
         """Get detailed market info including token IDs"""
+        # Wall-clock timestamps so entries stay valid when persisted to disk
+        cached = self._details_cache.get(market_id)
+        if cached and time.time() - cached[0] < config.CACHE_TTL_DETAILS:
+            return cached[1]
+        
+        return await self._coalesce(
+            ("details", market_id),
+            lambda: self._fetch_market_details(market_id),
+        )
+    
+    async def _fetch_market_details(self, market_id: str) -> Optional[Dict]:
         url = f"{config.GAMMA_API}/markets/{market_id}"
         
         try:
@@ -180,59 +302,74 @@ class PolymarketClient:
                 if resp.status != 200:
                     return None
                 
-                return await resp.json()
+                data = orjson.loads(await resp.read())
+                self._details_cache[market_id] = (time.time(), data)
+                return data
                 
         except Exception as e:
             logger.warning("market_details_failed", market_id=market_id, error=str(e))
             return None
     
-    async def scan_all_markets(self) -> List[Market]:
+    async def scan_all_markets(self, max_markets: Optional[int] = None) -> List[Market]:
         """Scan all active markets with volume"""
+        max_markets = max_markets or config.MAX_MARKETS
         markets = []
         offset = 0
         batch_size = 100
         
-        while len(markets) < config.MAX_MARKETS:
-            batch = await self.get_markets(
-                limit=batch_size,
-                offset=offset,
-                closed=False,
-                volume_min=config.MIN_VOLUME,
-            )
+        # Pages are independent, so speculatively fetch every page we could
+        # need in one concurrent wave instead of one round-trip per page
+        pages_per_wave = max(1, -(-max_markets // batch_size))
+        
+        while len(markets) < max_markets:
+            offsets = [offset + i * batch_size for i in range(pages_per_wave)]
+            batches = await asyncio.gather(*(
+                self.get_markets(
+                    limit=batch_size,
+                    offset=o,
+                    closed=False,
+                    volume_min=config.MIN_VOLUME,
+                )
+                for o in offsets
+            ))
             
-            if not batch:
-                break
+            exhausted = False
+            for batch in batches:
+                markets.extend(batch)
                 
-            markets.extend(batch)
-            offset += batch_size
+                # Stop if we got less than batch_size (no more markets)
+                if len(batch) < batch_size:
+                    exhausted = True
+                    break
             
-            # Stop if we got less than batch_size (no more markets)
-            if len(batch) < batch_size:
+            if exhausted:
                 break
+            offset += pages_per_wave * batch_size
         
         # Sort by volume descending
         markets.sort(key=lambda m: m.volume, reverse=True)
         
-        self._markets_cache = markets[:config.MAX_MARKETS]
-        return self._markets_cache
+        return markets[:max_markets]
     
     async def get_token_ids_for_markets(self, markets: List[Market]) -> Dict[str, List[str]]:
         """Get token IDs for a list of markets (needed for price data)"""
         # This requires fetching market details
-        # For now, we'll use a simplified approach
-        
         result = {}
         
-        # Batch fetch in groups of 20
-        for i in range(0, len(markets), 20):
-            batch = markets[i:i+20]
-            tasks = [self.get_market_details(m.id) for m in batch]
-            details = await asyncio.gather(*tasks, return_exceptions=True)
-            
-            for market, detail in zip(batch, details):
-                if isinstance(detail, dict):
-                    tokens = detail.get("clobTokenIds", [])
-                    if tokens:
-                        result[market.id] = tokens
+        # Launch every detail request at once; the semaphore matches the
+        # connector's per-host cap so requests queue on it, not on the pool
+        sem = asyncio.Semaphore(config.CONNECTION_LIMIT_PER_HOST)
+        
+        async def _fetch(market: Market):
+            async with sem:
+                return market, await self.get_market_details(market.id)
+        
+        pairs = await asyncio.gather(*(_fetch(m) for m in markets))
+        
+        for market, detail in pairs:
+            if isinstance(detail, dict):
+                tokens = detail.get("clobTokenIds", [])
+                if tokens:
+                    result[market.id] = tokens
         
         return result
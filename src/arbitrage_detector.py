@@ -2,18 +2,16 @@
 Arbitrage Detection Engine
 """
 import asyncio
-import logging
-import sys
-
-# Suppress noisy logs in scan mode
-if not sys.stdout.isatty():
-    import structlog
-    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.CRITICAL))
-from typing import List, Dict, Set, Optional
-from datetime import datetime
-from collections import defaultdict
-import structlog
+import bisect
+import functools
+import heapq
+import itertools
+import re
+import time
+from typing import List, Dict, Deque, Optional, Tuple
+from collections import deque
 
+from ._log import logger
 from .config import config
 from .models import (
     Market, 
@@ -23,7 +21,14 @@ from .models import (
 )
 from .api_client import PolymarketClient
 
-logger = structlog.get_logger()
+# Time qualifiers stripped to get the core event, e.g. "on February 24"
+_TIME_RE = re.compile(r'\s+(on|by|before|after|during)\s+.*$')
+
+
+@functools.lru_cache(maxsize=2048)
+def _core_event_key(question_lc: str) -> str:
+    """Core event of a lowercased question (memoized; questions persist across scans)"""
+    return _TIME_RE.sub('', question_lc).strip()
 
 
 class ArbitrageDetector:
@@ -31,9 +36,12 @@ class ArbitrageDetector:
     
     def __init__(self, client: PolymarketClient):
         self.client = client
-        self._processed_conditions: Set[str] = set()
-        self._flagged_markets: Dict[str, Market] = {}  # Markets needing deep check
-        self._opportunity_history: List[ArbitrageOpportunity] = []
+        self._flagged_markets: Dict[str, Market] = {}  # Markets needing deep check (this scan)
+        self._opportunity_history: Deque[ArbitrageOpportunity] = deque(maxlen=1000)
+        # Opportunity IDs: one timestamp per scan plus a per-prefix sequence
+        self._scan_ts: int = time.time_ns() // 1_000_000_000
+        self._id_seqs: Dict[str, itertools.count] = {}
+        self._reset_id_seqs()
     
     async def full_scan(self, markets: List[Market]) -> List[ArbitrageOpportunity]:
         """Run full arbitrage detection scan"""
@@ -41,17 +49,29 @@ class ArbitrageDetector:
         
         logger.info("starting_full_scan", market_count=len(markets))
         
-        # Stage 1: Probability sum anomalies
-        prob_opps = await self._detect_prob_sum_anomalies(markets)
-        opportunities.extend(prob_opps)
+        # Flags only describe the current scan; don't carry them over
+        self._flagged_markets.clear()
+        self._scan_ts = time.time_ns() // 1_000_000_000
+        self._reset_id_seqs()
         
+        # Stage 1: Probability sum anomalies
         # Stage 2: Cross-market opportunities (group by similar questions)
-        cross_opps = await self._detect_cross_market_opportunities(markets)
+        # Pure CPU and independent of each other, so run both on worker
+        # threads to keep the event loop free; stage 1 returns its flags
+        # instead of writing shared state
+        (prob_opps, flagged), cross_opps = await asyncio.gather(
+            asyncio.to_thread(self._detect_prob_sum_anomalies, markets),
+            asyncio.to_thread(self._detect_cross_market_opportunities, markets),
+        )
+        self._flagged_markets.update(flagged)
+        opportunities.extend(prob_opps)
         opportunities.extend(cross_opps)
         
-        # Stage 3: Wide spread detection (requires orderbook)
-        spread_opps = await self._detect_spread_opportunities(markets)
-        opportunities.extend(spread_opps)
+        # Stage 3: Wide spread detection (requires orderbook, uses stage 1 flags)
+        # Nothing flagged means nothing to fetch; skip its HTTP round-trips
+        if self._flagged_markets:
+            spread_opps = await self._detect_spread_opportunities(markets)
+            opportunities.extend(spread_opps)
         
         # Deduplicate
         opportunities = self._deduplicate_opportunities(opportunities)
@@ -59,58 +79,79 @@ class ArbitrageDetector:
         logger.info("scan_complete", opportunities=len(opportunities))
         return opportunities
     
-    async def _detect_prob_sum_anomalies(
+    def _reset_id_seqs(self):
+        # One counter per stage so threaded stages never share one
+        self._id_seqs = {p: itertools.count() for p in ("prob", "cross", "spread")}
+    
+    def _next_id(self, prefix: str, *parts: str) -> str:
+        """Opportunity ID unique within a scan, e.g. prob_<cid>_<ts>_<seq>"""
+        seq = next(self._id_seqs[prefix])
+        return "_".join((prefix, *parts, str(self._scan_ts), str(seq)))
+    
+    def _detect_prob_sum_anomalies(
         self, 
         markets: List[Market]
-    ) -> List[ArbitrageOpportunity]:
+    ) -> Tuple[List[ArbitrageOpportunity], Dict[str, Market]]:
         """
         Detect when outcome probabilities don't sum to 1.
         In efficient markets, sum should be ~1.0 (minus spread).
         Deviations indicate potential arbitrage.
+        
+        Returns the opportunities and the markets to flag for the spread
+        stage (keyed by market ID).
         """
         opportunities = []
+        flagged: Dict[str, Market] = {}
         
-        for market in markets:
-            if len(market.outcomes) < 2:
-                continue
-            
+        threshold = config.PROB_SUM_THRESHOLD
+        fast_path = config.PROB_SUM_FAST_PATH
+        
+        # Single filtering pass over the cached sums; only hits build objects.
+        # Binary quotes are normalized server-side when the fast path is on.
+        hits = [
+            m for m in markets
+            if len(m.outcomes) >= 2
+            and m.prob_imbalance > threshold
+            and not (fast_path and len(m.outcomes) == 2 and m.is_binary_yesno)
+        ]
+        
+        for market in hits:
             prob_sum = market.prob_sum
-            deviation = abs(prob_sum - 1.0)
+            deviation = market.prob_imbalance
+            
+            # Calculate theoretical profit
+            if prob_sum > 1.0:
+                # Sell overweight outcomes
+                profit_pct = (prob_sum - 1.0) / prob_sum
+                action = "卖出高概率结果"
+            else:
+                # Buy underweight outcomes
+                profit_pct = (1.0 - prob_sum)
+                action = "买入低概率结果"
+            
+            opp = ArbitrageOpportunity(
+                id=self._next_id("prob", market.condition_id),
+                type=OpportunityType.PROB_SUM,
+                markets=[market],
+                profit_estimate=profit_pct,
+                details={
+                    "prob_sum": prob_sum,
+                    "deviation": deviation,
+                    "action": action,
+                    "condition_id": market.condition_id,
+                }
+            )
+            opportunities.append(opp)
             
-            if deviation > config.PROB_SUM_THRESHOLD:
-                # Calculate theoretical profit
-                if prob_sum > 1.0:
-                    # Sell overweight outcomes
-                    profit_pct = (prob_sum - 1.0) / prob_sum
-                    action = "卖出高概率结果"
-                else:
-                    # Buy underweight outcomes
-                    profit_pct = (1.0 - prob_sum)
-                    action = "买入低概率结果"
-                
-                opp = ArbitrageOpportunity(
-                    id=f"prob_{market.condition_id}_{int(datetime.now().timestamp())}",
-                    type=OpportunityType.PROB_SUM,
-                    markets=[market],
-                    profit_estimate=profit_pct,
-                    details={
-                        "prob_sum": prob_sum,
-                        "deviation": deviation,
-                        "action": action,
-                        "condition_id": market.condition_id,
-                    }
-                )
-                opportunities.append(opp)
-                
-                # Flag for deeper monitoring
-                self._flagged_markets[market.id] = market
+            # Flag for deeper monitoring
+            flagged[market.id] = market
         
         if opportunities:
             logger.info("prob_sum_anomalies", count=len(opportunities))
         
-        return opportunities
+        return opportunities, flagged
     
-    async def _detect_cross_market_opportunities(
+    def _detect_cross_market_opportunities(
         self, 
         markets: List[Market]
     ) -> List[ArbitrageOpportunity]:
@@ -120,46 +161,92 @@ class ArbitrageDetector:
         """
         opportunities = []
         
-        # Group markets by similar keywords/questions
-        market_groups = self._group_similar_markets(markets)
+        # Only binary Yes/No markets can form a cross-market pair; drop the
+        # rest before paying for grouping
+        yn_markets = [m for m in markets if m.is_binary_yesno]
+        
+        # Group markets by core event; only markets in the same group can pair
+        market_groups = self._group_similar_markets(yn_markets)
         
         for group_key, group_markets in market_groups.items():
-            if len(group_markets) < 2:
+            # Skip the whole group when even its cheapest Yes + No combo
+            # can't clear the threshold
+            if 1.0 - self._min_cross_cost(group_markets) <= config.SPREAD_THRESHOLD:
                 continue
             
-            # Look for complementary or competing markets
-            for i, m1 in enumerate(group_markets):
-                for m2 in group_markets[i+1:]:
-                    # Check if they're on same event with opposing outcomes
-                    cross_opp = self._check_cross_market(m1, m2)
-                    if cross_opp:
-                        opportunities.append(cross_opp)
+            # Look for complementary or competing markets, only among pairs
+            # whose Yes + No cost can clear the threshold
+            for i, j in self._candidate_pairs(group_markets):
+                # Check if they're on same event with opposing outcomes
+                cross_opp = self._check_cross_market(group_markets[i], group_markets[j])
+                if cross_opp:
+                    opportunities.append(cross_opp)
         
         if opportunities:
             logger.info("cross_market_opportunities", count=len(opportunities))
         
         return opportunities
     
+    @staticmethod
+    def _min_cross_cost(markets: List[Market]) -> float:
+        """
+        Lowest Yes + No cost over pairs of distinct binary markets.
+        
+        A lower bound for every pair _check_cross_market will price, so a
+        group whose bound leaves no profit can be skipped without pairing.
+        """
+        cheap_yes = heapq.nsmallest(2, markets, key=lambda m: m.yes_price)
+        cheap_no = heapq.nsmallest(2, markets, key=lambda m: m.no_price)
+        
+        if cheap_yes[0] is not cheap_no[0]:
+            return cheap_yes[0].yes_price + cheap_no[0].no_price
+        
+        # Cheapest Yes and No are on the same market; pair it with runner-up
+        return min(
+            cheap_yes[0].yes_price + cheap_no[1].no_price,
+            cheap_yes[1].yes_price + cheap_no[0].no_price,
+        )
+    
+    @staticmethod
+    def _candidate_pairs(markets: List[Market]) -> List[Tuple[int, int]]:
+        """
+        Index pairs (i < j) where buying Yes on one and No on the other
+        might clear the threshold, in the order a nested loop would visit them.
+        
+        With markets sorted by No price, the partners that make m.Yes + No
+        cheap enough form a prefix found by bisect, so the scan is
+        O(g log g + candidates) rather than every pair in the group.
+        """
+        # Slightly permissive; _check_cross_market applies the exact test
+        limit = 1.0 - config.SPREAD_THRESHOLD + 1e-9
+        
+        by_no = sorted(range(len(markets)), key=lambda k: markets[k].no_price)
+        no_prices = [markets[k].no_price for k in by_no]
+        
+        pairs = set()
+        for i, m in enumerate(markets):
+            cut = bisect.bisect_left(no_prices, limit - m.yes_price)
+            for k in by_no[:cut]:
+                if k != i:
+                    pairs.add((i, k) if i < k else (k, i))
+        
+        return sorted(pairs)
+    
     def _group_similar_markets(self, markets: List[Market]) -> Dict[str, List[Market]]:
-        """Group markets by similar keywords"""
-        groups = defaultdict(list)
+        """Group markets by core event (question without time qualifiers)"""
+        groups: Dict[str, List[Market]] = {}
         
-        # Normalize question for grouping
         for market in markets:
-            # Simple grouping: use first few significant words
-            q = market.question.lower()
+            # Extract core event (remove time qualifiers like "on February 24")
+            key = _core_event_key(market.question_lc)
             
-            # Remove common words
-            stop_words = {"will", "the", "a", "an", "be", "is", "are", "to", "of", "in", "on"}
-            words = [w for w in q.split() if w not in stop_words]
-            
-            if words:
-                # Use first 3 words as group key
-                key = " ".join(words[:3])
-                groups[key].append(market)
+            if key:
+                groups.setdefault(key, []).append(market)
         
-        # Only return groups with multiple markets
-        return {k: v for k, v in groups.items() if len(v) >= 2}
+        # Only return groups with multiple markets (pruned in place)
+        for key in [k for k, v in groups.items() if len(v) < 2]:
+            del groups[key]
+        return groups
     
     def _check_cross_market(
         self, 
@@ -169,41 +256,26 @@ class ArbitrageDetector:
         """
         Check if two markets offer cross-market arbitrage.
         
+        Both markets must come from the same core-event group (see
+        _group_similar_markets).
+        
         Valid cases:
         1. Same event, different expiry (e.g., "BTC>$60k today" vs "BTC>$60k this week")
         2. Complementary outcomes on same event (e.g., "X wins" vs "X loses")
         """
         
-        # Skip if same condition ID (same market)
-        if m1.condition_id == m2.condition_id:
-            return None
-        
-        # Check if they're truly the same underlying event
-        # Require high similarity in question text (not just first 3 words)
-        q1 = m1.question.lower()
-        q2 = m2.question.lower()
-        
-        # Extract core event (remove time qualifiers like "on February 24")
-        import re
-        core_event_1 = re.sub(r'\s+(on|by|before|after|during)\s+.*$', '', q1).strip()
-        core_event_2 = re.sub(r'\s+(on|by|before|after|during)\s+.*$', '', q2).strip()
-        
-        # Must be same core event
-        if core_event_1 != core_event_2:
+        # Both must be binary Yes/No markets
+        if not (m1.is_binary_yesno and m2.is_binary_yesno):
             return None
         
-        # Check if outcomes are complementary (Yes/No type)
-        outcomes_1 = {o.name.lower() for o in m1.outcomes}
-        outcomes_2 = {o.name.lower() for o in m2.outcomes}
-        
-        # Both must be binary Yes/No markets
-        if not ({"yes", "no"} <= outcomes_1 and {"yes", "no"} <= outcomes_2):
+        # Skip if same condition ID (same market)
+        if m1.condition_id == m2.condition_id:
             return None
         
-        yes_price_1 = next(o.price for o in m1.outcomes if o.name.lower() == "yes")
-        no_price_1 = next(o.price for o in m1.outcomes if o.name.lower() == "no")
-        yes_price_2 = next(o.price for o in m2.outcomes if o.name.lower() == "yes")
-        no_price_2 = next(o.price for o in m2.outcomes if o.name.lower() == "no")
+        yes_price_1 = m1.yes_price
+        no_price_1 = m1.no_price
+        yes_price_2 = m2.yes_price
+        no_price_2 = m2.no_price
         
         # Calculate valid arbitrage:
         # If m1.Yes + m2.No < 1, buy both and profit = 1 - (m1.Yes + m2.No)
@@ -217,37 +289,31 @@ class ArbitrageDetector:
         
         best_profit = max(profit_1, profit_2)
         
-        if best_profit > config.SPREAD_THRESHOLD:
-            if profit_1 > profit_2:
-                action = f"买 {m1.question[:30]}... 的 Yes + 买 {m2.question[:30]}... 的 No"
-                details = {
-                    "action": action,
-                    "buy_yes_at": m1.question[:40],
-                    "buy_no_at": m2.question[:40],
-                    "cost": combo_1,
-                    "payout": 1.0,
-                    "profit": best_profit,
-                }
-            else:
-                action = f"买 {m1.question[:30]}... 的 No + 买 {m2.question[:30]}... 的 Yes"
-                details = {
-                    "action": action,
-                    "buy_no_at": m1.question[:40],
-                    "buy_yes_at": m2.question[:40],
-                    "cost": combo_2,
-                    "payout": 1.0,
-                    "profit": best_profit,
-                }
-            
-            return ArbitrageOpportunity(
-                id=f"cross_{m1.condition_id}_{m2.condition_id}_{int(datetime.now().timestamp())}",
-                type=OpportunityType.CROSS_MARKET,
-                markets=[m1, m2],
-                profit_estimate=best_profit,
-                details=details
-            )
+        if best_profit <= config.SPREAD_THRESHOLD:
+            return None
         
-        return None
+        # Which leg to buy on each market
+        if profit_1 > profit_2:
+            leg_1, leg_2, cost = "Yes", "No", combo_1
+        else:
+            leg_1, leg_2, cost = "No", "Yes", combo_2
+        
+        details = {
+            "action": f"买 {m1.question[:30]}... 的 {leg_1} + 买 {m2.question[:30]}... 的 {leg_2}",
+            f"buy_{leg_1.lower()}_at": m1.question[:40],
+            f"buy_{leg_2.lower()}_at": m2.question[:40],
+            "cost": cost,
+            "payout": 1.0,
+            "profit": best_profit,
+        }
+        
+        return ArbitrageOpportunity(
+            id=self._next_id("cross", m1.condition_id, m2.condition_id),
+            type=OpportunityType.CROSS_MARKET,
+            markets=[m1, m2],
+            profit_estimate=best_profit,
+            details=details
+        )
     
     async def _detect_spread_opportunities(
         self, 
@@ -259,8 +325,13 @@ class ArbitrageDetector:
         """
         opportunities = []
         
-        # Only check flagged markets to save API calls
-        markets_to_check = list(self._flagged_markets.values())
+        # Only check flagged markets to save API calls, most anomalous first,
+        # capped so a noisy stage 1 can't blow up the details fan-out
+        markets_to_check = heapq.nlargest(
+            config.MAX_FLAGGED_MARKETS,
+            self._flagged_markets.values(),
+            key=lambda m: m.prob_imbalance,
+        )
         
         if not markets_to_check:
             return []
@@ -268,41 +339,46 @@ class ArbitrageDetector:
         # Get token IDs for these markets
         token_map = await self.client.get_token_ids_for_markets(markets_to_check)
         
-        all_token_ids = []
-        market_token_map = {}
-        for market in markets_to_check:
-            tokens = token_map.get(market.id, [])
-            for token in tokens:
-                all_token_ids.append(token)
-                market_token_map[token] = market
+        # One pass builds the token -> market map; its keys are the
+        # (deduplicated) token IDs to price
+        market_token_map = {
+            token: market
+            for market in markets_to_check
+            for token in token_map.get(market.id, [])
+        }
+        all_token_ids = list(market_token_map)
         
         if not all_token_ids:
             return []
         
-        # Batch fetch spreads
-        spreads = await self.client.get_spreads(all_token_ids[:100])  # Limit batch
+        # Batch fetch spreads with midpoints/prices in the same round-trip
+        quotes = await self.client.get_prices_midpoints_spreads(all_token_ids[:100])  # Limit batch
+        spreads = quotes["spreads"]
+        midpoints = quotes["midpoints"]
+        prices = quotes["prices"]
         
         for token_id, spread in spreads.items():
-            if spread > config.SPREAD_THRESHOLD:
-                market = market_token_map.get(token_id)
-                if market:
-                    # Midpoint might be exploitable
-                    midpoints = await self.client.get_midpoints([token_id])
-                    mid = midpoints.get(token_id, 0.5)
-                    
-                    opp = ArbitrageOpportunity(
-                        id=f"spread_{token_id}_{int(datetime.now().timestamp())}",
-                        type=OpportunityType.SPREAD,
-                        markets=[market],
-                        profit_estimate=spread,
-                        details={
-                            "spread": spread,
-                            "mid_price": mid,
-                            "token_id": token_id,
-                            "action": "挂单套利",
-                        }
-                    )
-                    opportunities.append(opp)
+            market = market_token_map.get(token_id)
+            if spread <= config.SPREAD_THRESHOLD or not market:
+                continue
+            
+            # Midpoint might be exploitable
+            mid = midpoints.get(token_id, 0.5)
+            
+            opp = ArbitrageOpportunity(
+                id=self._next_id("spread", token_id),
+                type=OpportunityType.SPREAD,
+                markets=[market],
+                profit_estimate=spread,
+                details={
+                    "spread": spread,
+                    "mid_price": mid,
+                    "price": prices.get(token_id),
+                    "token_id": token_id,
+                    "action": "挂单套利",
+                }
+            )
+            opportunities.append(opp)
         
         if opportunities:
             logger.info("spread_opportunities", count=len(opportunities))
@@ -318,9 +394,8 @@ class ArbitrageDetector:
         unique = []
         
         for opp in opportunities:
-            # Use market IDs as key
-            market_keys = tuple(sorted(m.id for m in opp.markets))
-            key = (opp.type.value, market_keys)
+            # Use market IDs as key (order-independent, no sort needed)
+            key = (opp.type.value, frozenset(m.id for m in opp.markets))
             
             if key not in seen:
                 seen.add(key)
@@ -329,8 +404,8 @@ class ArbitrageDetector:
         return unique
     
     def get_opportunity_history(self) -> List[ArbitrageOpportunity]:
-        """Get all detected opportunities"""
-        return self._opportunity_history
+        """Get recently detected opportunities (last 1000)"""
+        return list(self._opportunity_history)
     
     def clear_flagged(self):
         """Clear flagged markets"""
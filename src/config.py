@@ -22,14 +22,21 @@ class Config:
     PROB_SUM_THRESHOLD: float = 0.03     # Prob sum deviation >3% = potential arb
     SPREAD_THRESHOLD: float = 0.02      # Bid-ask spread >2% = opportunity
     MIN_LIQUIDITY: float = 1000          # Min liquidity to consider
+    PROB_SUM_FAST_PATH: bool = False     # Trust binary Yes/No quotes to sum to 1, skip them
     
     # Filters
     MIN_VOLUME: float = 10000            # Min 24h volume
     MAX_MARKETS: int = 500               # Max markets to scan
+    MAX_FLAGGED_MARKETS: int = 20        # Max flagged markets checked for spreads
+    MAX_SEEN_OPPORTUNITIES: int = 50_000 # Remembered opportunity IDs (oldest evicted)
     
     # Notification
     TELEGRAM_BOT_TOKEN: Optional[str] = None
     TELEGRAM_CHAT_ID: Optional[str] = None
+    TELEGRAM_CHAT_INTERVAL: float = 1.0  # Min gap between messages to one chat (s)
+    TELEGRAM_MAX_RETRIES: int = 3        # Retries on HTTP 429, honouring retry_after
+    TELEGRAM_MAX_RETRY_WAIT: float = 30.0  # Longer flood waits drop the message
+    TELEGRAM_QUEUE_SIZE: int = 1000      # Pending messages before new ones are dropped
     
     # Logging
     LOG_LEVEL: str = "INFO"
@@ -39,6 +46,17 @@ class Config:
     MAX_CONCURRENT_REQUESTS: int = 20
     REQUEST_TIMEOUT: int = 10
     
+    # Connection pool
+    CONNECTION_LIMIT: int = 64           # Total pooled connections
+    CONNECTION_LIMIT_PER_HOST: int = 16  # Per-host cap (gamma / clob)
+    KEEPALIVE_TIMEOUT: int = 60          # Keep idle connections open (s)
+    DNS_CACHE_TTL: int = 300             # Cache resolved hosts (s)
+    
+    # Response caching (seconds)
+    CACHE_TTL_MARKETS: int = 30          # /markets listing pages
+    CACHE_TTL_DETAILS: int = 3600        # /markets/{id}, token IDs never change
+    DETAILS_CACHE_FILE: Optional[str] = None  # Persist details cache across runs
+    
     @classmethod
     def from_env(cls):
         """Load config from environment variables"""
@@ -46,6 +64,7 @@ class Config:
             TELEGRAM_BOT_TOKEN=os.getenv("TELEGRAM_BOT_TOKEN"),
             TELEGRAM_CHAT_ID=os.getenv("TELEGRAM_CHAT_ID"),
             LOG_LEVEL=os.getenv("LOG_LEVEL", "INFO"),
+            DETAILS_CACHE_FILE=os.getenv("DETAILS_CACHE_FILE"),
         )
 
 
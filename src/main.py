@@ -5,20 +5,30 @@ Polymarket Arbitrage Monitor - Main Entry Point
 Production-grade arbitrage detection system for Polymarket prediction markets.
 
 Usage:
-    python -m src.main
+    python -m src.main [--quiet]
+    
+Options:
+    --quiet            Only log critical errors
     
 Environment variables:
     TELEGRAM_BOT_TOKEN  - Bot token for alerts
     TELEGRAM_CHAT_ID    - Chat ID to receive alerts
     LOG_LEVEL          - DEBUG, INFO, WARNING, ERROR
 """
+import argparse
 import asyncio
+import logging
 import signal
 import sys
+from collections import OrderedDict
 from datetime import datetime
-from typing import Set
 import structlog
 
+try:
+    import uvloop  # Optional faster event loop
+except ImportError:
+    uvloop = None
+
 # Configure structured logging
 structlog.configure(
     processors=[
@@ -55,7 +65,8 @@ class ArbitrageMonitor:
         self.notifier = get_notifier()
         
         self._running = False
-        self._seen_opportunity_ids: Set[str] = set()
+        # Insertion-ordered so the oldest IDs can be evicted past the cap
+        self._seen_opportunity_ids: "OrderedDict[str, None]" = OrderedDict()
         self._last_full_scan = None
         
         # Statistics
@@ -117,23 +128,29 @@ class ArbitrageMonitor:
         # Run detection
         opportunities = await self.detector.full_scan(markets)
         
+        # Flags only matter inside full_scan; drop the references until next cycle
+        self.detector.clear_flagged()
+        
         # Filter to new opportunities
         new_opps = [o for o in opportunities if o.id not in self._seen_opportunity_ids]
         
         if new_opps:
+            seen = self._seen_opportunity_ids
             for opp in new_opps:
-                self._seen_opportunity_ids.add(opp.id)
+                seen[opp.id] = None
+            while len(seen) > config.MAX_SEEN_OPPORTUNITIES:
+                seen.popitem(last=False)
             
             self.stats["opportunities"] += len(new_opps)
             
-            # Send notifications
-            notified = await self.notifier.notify_opportunities(new_opps)
-            self.stats["notifications"] += notified
+            # Send notifications (Telegram queues them and returns immediately)
+            queued = await self.notifier.notify_opportunities(new_opps)
+            self.stats["notifications"] += queued
             
             logger.info(
                 "new_opportunities", 
                 count=len(new_opps),
-                notified=notified,
+                queued=queued,
             )
         
         self._last_full_scan = datetime.now()
@@ -164,5 +181,19 @@ async def main():
         monitor.stop()
 
 
+def _parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Polymarket arbitrage monitor")
+    parser.add_argument("--quiet", action="store_true", help="only log critical errors")
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    args = _parse_args()
+    if args.quiet:
+        structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.CRITICAL))
+    
+    # uvloop.run replaces the deprecated uvloop.install() policy swap
+    if uvloop is not None:
+        uvloop.run(main())
+    else:
+        asyncio.run(main())
@@ -1,11 +1,14 @@
 """
 Data models for Polymarket Arbitrage Monitor
 """
+from array import array
 from dataclasses import dataclass, field
 from typing import List, Dict, Optional, Any
 from datetime import datetime
 from enum import Enum
-import json
+from operator import itemgetter
+import time
+import orjson
 
 
 class OpportunityType(Enum):
@@ -15,13 +18,24 @@ class OpportunityType(Enum):
     LIQUIDITY_ARB = "liquidity_arb" #流动性差异套利
 
 
+_price = itemgetter("price")
+_size = itemgetter("size")
+
+OPPORTUNITY_EMOJI = {
+    OpportunityType.PROB_SUM: "📊",
+    OpportunityType.CROSS_MARKET: "🔄",
+    OpportunityType.SPREAD: "📈",
+    OpportunityType.LIQUIDITY_ARB: "💧",
+}
+
+
 class MarketStatus(Enum):
     ACTIVE = "active"
     CLOSED = "closed"
     RESOLVED = "resolved"
 
 
-@dataclass
+@dataclass(slots=True)
 class Outcome:
     """Single outcome for a market"""
     name: str
@@ -33,7 +47,7 @@ class Outcome:
             self.price = float(self.price)
 
 
-@dataclass
+@dataclass(slots=True)
 class Market:
     """Polymarket market"""
     id: str
@@ -46,14 +60,27 @@ class Market:
     end_date: Optional[datetime] = None
     created_at: Optional[datetime] = None
     
-    @property
-    def prob_sum(self) -> float:
-        return sum(o.price for o in self.outcomes)
+    # Derived once in __post_init__ for the detection hot path
+    question_lc: str = field(default="", init=False, repr=False, compare=False)
+    yes_price: Optional[float] = field(default=None, init=False, repr=False, compare=False)
+    no_price: Optional[float] = field(default=None, init=False, repr=False, compare=False)
+    is_binary_yesno: bool = field(default=False, init=False, repr=False, compare=False)
+    prob_sum: float = field(default=0.0, init=False, repr=False, compare=False)
+    prob_imbalance: float = field(default=0.0, init=False, repr=False, compare=False)  # |prob_sum - 1|
     
-    @property
-    def prob_imbalance(self) -> float:
-        """How far from 1.0 is the sum"""
-        return abs(self.prob_sum - 1.0)
+    def __post_init__(self):
+        self.question_lc = self.question.lower()
+        self.prob_sum = sum(o.price for o in self.outcomes)
+        self.prob_imbalance = abs(self.prob_sum - 1.0)
+        
+        for o in self.outcomes:
+            name = o.name.lower()
+            if name == "yes" and self.yes_price is None:
+                self.yes_price = o.price
+            elif name == "no" and self.no_price is None:
+                self.no_price = o.price
+        
+        self.is_binary_yesno = self.yes_price is not None and self.no_price is not None
     
     @property
     def token_ids(self) -> List[str]:
@@ -71,14 +98,14 @@ class Market:
         if isinstance(outcome_names, str):
             # Sometimes comes as JSON string
             try:
-                outcome_names = json.loads(outcome_names)
-            except:
+                outcome_names = orjson.loads(outcome_names)
+            except orjson.JSONDecodeError:
                 outcome_names = [outcome_names]
         
         if isinstance(outcome_prices, str):
             try:
-                outcome_prices = json.loads(outcome_prices)
-            except:
+                outcome_prices = orjson.loads(outcome_prices)
+            except orjson.JSONDecodeError:
                 outcome_prices = [0.5] * len(outcome_names)
         
         outcomes = []
@@ -100,24 +127,42 @@ class Market:
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class OrderBook:
-    """Order book for a token"""
+    """Order book for a token, stored column-wise (one float array per field)"""
     token_id: str
-    bids: List[Dict]  # [{"price": 0.45, "size": 100}, ...]
-    asks: List[Dict]
+    bid_prices: array = field(default_factory=lambda: array("d"))
+    bid_sizes: array = field(default_factory=lambda: array("d"))
+    ask_prices: array = field(default_factory=lambda: array("d"))
+    ask_sizes: array = field(default_factory=lambda: array("d"))
     spread: float = 0.0
     mid_price: float = 0.5
     
     def __post_init__(self):
-        if self.bids and self.asks:
-            best_bid = max(b["price"] for b in self.bids)
-            best_ask = min(a["price"] for a in self.asks)
+        if self.bid_prices and self.ask_prices:
+            # Level order isn't documented by the CLOB, so scan every level
+            best_bid = max(self.bid_prices)
+            best_ask = min(self.ask_prices)
             self.spread = best_ask - best_bid
             self.mid_price = (best_bid + best_ask) / 2
+    
+    @classmethod
+    def from_clob(cls, token_id: str, data: Dict) -> "OrderBook":
+        """Parse a CLOB book ({"bids": [{"price": "0.45", "size": "100"}, ...]})"""
+        bids = data.get("bids", [])
+        asks = data.get("asks", [])
+        
+        # Prices and sizes arrive as strings; convert each column in one pass
+        return cls(
+            token_id=token_id,
+            bid_prices=array("d", map(float, map(_price, bids))),
+            bid_sizes=array("d", map(float, map(_size, bids))),
+            ask_prices=array("d", map(float, map(_price, asks))),
+            ask_sizes=array("d", map(float, map(_size, asks))),
+        )
 
 
-@dataclass
+@dataclass(slots=True)
 class ArbitrageOpportunity:
     """Detected arbitrage opportunity"""
     id: str
@@ -125,28 +170,29 @@ class ArbitrageOpportunity:
     markets: List[Market]  # Related markets
     profit_estimate: float  # Expected profit %
     details: Dict[str, Any]
-    detected_at: datetime = field(default_factory=datetime.now)
+    detected_at_ts: float = field(default_factory=time.time)  # Epoch seconds
     notified: bool = False
     
+    @property
+    def detected_at(self) -> datetime:
+        """Detection time as a local datetime, built only when asked for"""
+        return datetime.fromtimestamp(self.detected_at_ts)
+    
     def to_message(self) -> str:
         """Format as Telegram message"""
-        emoji = {
-            OpportunityType.PROB_SUM: "📊",
-            OpportunityType.CROSS_MARKET: "🔄",
-            OpportunityType.SPREAD: "📈",
-            OpportunityType.LIQUIDITY_ARB: "💧",
-        }.get(self.type, "🎯")
+        emoji = OPPORTUNITY_EMOJI.get(self.type, "🎯")
         
-        msg = f"{emoji} *套利机会 #{self.id[:8]}*\n"
-        msg += f"类型: {self.type.value}\n"
-        msg += f"预估收益: *{self.profit_estimate:.2%}*\n\n"
+        parts = [
+            f"{emoji} *套利机会 #{self.id[:8]}*\n",
+            f"类型: {self.type.value}\n",
+            f"预估收益: *{self.profit_estimate:.2%}*\n\n",
+        ]
         
         for m in self.markets:
-            msg += f"• {m.question[:60]}...\n"
-            for o in m.outcomes:
-                msg += f"  - {o.name}: {o.price:.2%}\n"
+            parts.append(f"• {m.question[:60]}...\n")
+            parts.extend(f"  - {o.name}: {o.price:.2%}\n" for o in m.outcomes)
         
         if self.details.get("action"):
-            msg += f"\n建议: {self.details['action']}"
+            parts.append(f"\n建议: {self.details['action']}")
         
-        return msg
+        return "".join(parts)
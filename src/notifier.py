@@ -2,14 +2,15 @@
 Notification System - Telegram alerts for arbitrage opportunities
 """
 import asyncio
+import orjson
+import sys
+import time
 from typing import List, Optional
-import structlog
 
+from ._log import logger
 from .config import config
 from .models import ArbitrageOpportunity
 
-logger = structlog.get_logger()
-
 
 class TelegramNotifier:
     """Send Telegram notifications for arbitrage opportunities"""
@@ -18,13 +19,35 @@ class TelegramNotifier:
         self.bot_token = bot_token or config.TELEGRAM_BOT_TOKEN
         self.chat_id = chat_id or config.TELEGRAM_CHAT_ID
         self._session = None
+        
+        # Static parts of every sendMessage call, built once
+        self._send_url = (
+            f"https://api.telegram.org/bot{self.bot_token}/sendMessage"
+            if self.bot_token else None
+        )
+        self._base_payload = {"chat_id": self.chat_id, "parse_mode": "Markdown"}
+        
+        # Outgoing messages, drained by a background task so scans never wait
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._next_send_at = 0.0  # Per-chat pacer (monotonic)
     
     async def __aenter__(self):
         import aiohttp
         self._session = aiohttp.ClientSession()
+        self._queue = asyncio.Queue(maxsize=config.TELEGRAM_QUEUE_SIZE)
+        self._worker = asyncio.create_task(self._drain_queue())
         return self
     
     async def __aexit__(self, *args):
+        if self._worker:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            if not self._queue.empty():
+                logger.warning("telegram_queue_dropped", count=self._queue.qsize())
         if self._session:
             await self._session.close()
     
@@ -38,34 +61,76 @@ class TelegramNotifier:
             logger.warning("telegram_not_configured")
             return False
         
-        url = f"https://api.telegram.org/bot{self.bot_token}/sendMessage"
-        
-        payload = {
-            "chat_id": self.chat_id,
-            "text": message,
-            "parse_mode": parse_mode,
-        }
+        payload = {**self._base_payload, "text": message}
+        if parse_mode != "Markdown":
+            payload["parse_mode"] = parse_mode
         
         try:
-            async with self._session.post(url, json=payload) as resp:
-                if resp.status == 200:
-                    logger.info("telegram_sent", chat_id=self.chat_id)
-                    return True
-                else:
-                    error = await resp.text()
-                    logger.error("telegram_failed", status=resp.status, error=error)
+            for attempt in range(config.TELEGRAM_MAX_RETRIES + 1):
+                async with self._session.post(self._send_url, json=payload) as resp:
+                    if resp.status == 200:
+                        logger.info("telegram_sent", chat_id=self.chat_id)
+                        return True
+                    
+                    error = await resp.read()
+                    if resp.status != 429 or attempt == config.TELEGRAM_MAX_RETRIES:
+                        logger.error("telegram_failed", status=resp.status, error=error.decode(errors="replace"))
+                        return False
+                
+                # Flood control: Telegram says how long to back off
+                retry_after = self._retry_after(error)
+                if retry_after > config.TELEGRAM_MAX_RETRY_WAIT:
+                    # Long flood wait: drop this message, hold the pacer back
+                    self._next_send_at = time.monotonic() + retry_after
+                    logger.error("telegram_flood_wait", retry_after=retry_after)
                     return False
+                
+                logger.warning("telegram_rate_limited", retry_after=retry_after, attempt=attempt + 1)
+                await asyncio.sleep(retry_after)
                     
         except Exception as e:
             logger.error("telegram_error", error=str(e))
             return False
     
+    @staticmethod
+    def _retry_after(body: bytes) -> float:
+        """Seconds to wait from a 429 body ({"parameters": {"retry_after": N}})"""
+        try:
+            return float(orjson.loads(body)["parameters"]["retry_after"])
+        except (orjson.JSONDecodeError, KeyError, TypeError, ValueError):
+            return config.TELEGRAM_CHAT_INTERVAL
+    
+    async def _drain_queue(self):
+        """Send queued messages in order, one per TELEGRAM_CHAT_INTERVAL"""
+        while True:
+            opp, message = await self._queue.get()
+            try:
+                delay = self._next_send_at - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                
+                if await self.send(message) and opp is not None:
+                    opp.notified = True
+                self._next_send_at = max(
+                    self._next_send_at, time.monotonic() + config.TELEGRAM_CHAT_INTERVAL
+                )
+            finally:
+                self._queue.task_done()
+    
+    def _enqueue(self, opp: Optional[ArbitrageOpportunity], message: str) -> bool:
+        try:
+            self._queue.put_nowait((opp, message))
+            return True
+        except asyncio.QueueFull:
+            logger.warning("telegram_queue_full", size=self._queue.qsize())
+            return False
+    
     async def notify_opportunities(
         self, 
         opportunities: List[ArbitrageOpportunity],
         since=None
     ) -> int:
-        """Notify about new opportunities"""
+        """Queue notifications for new opportunities, returns how many were queued"""
         if not opportunities:
             return 0
         
@@ -75,21 +140,15 @@ class TelegramNotifier:
         if not new_opps:
             return 0
         
-        # Send each opportunity
-        sent = 0
-        for opp in new_opps:
-            message = opp.to_message()
-            if await self.send(message):
-                sent += 1
-                opp.notified = True
+        # Delivery is paced by the background task; don't block the scan
+        queued = sum(self._enqueue(opp, opp.to_message()) for opp in new_opps)
         
         # Send summary if multiple
         if len(new_opps) > 1:
-            summary = f"\n📋 *共发现 {len(new_opps)} 个新机会*"
-            await self.send(summary)
+            self._enqueue(None, f"\n📋 *共发现 {len(new_opps)} 个新机会*")
         
-        logger.info("notifications_sent", count=sent)
-        return sent
+        logger.info("notifications_queued", count=queued)
+        return queued
 
 
 class ConsoleNotifier:
@@ -100,12 +159,16 @@ class ConsoleNotifier:
         opportunities: List[ArbitrageOpportunity],
         since=None
     ) -> int:
+        divider = "=" * 50
+        parts = []
         for opp in opportunities:
             if not opp.notified:
-                print("\n" + "="*50)
-                print(opp.to_message())
-                print("="*50 + "\n")
+                parts.append(f"\n{divider}\n{opp.to_message()}\n{divider}\n\n")
                 opp.notified = True
+        
+        # One write for the whole batch instead of three prints per opportunity
+        if parts:
+            sys.stdout.write("".join(parts))
         return len(opportunities)
 
 
@@ -0,0 +1,94 @@
+"""
+Text reports for the scan scripts (stdout / cron delivery)
+"""
+import heapq
+from typing import List
+
+from .models import Market, ArbitrageOpportunity, OPPORTUNITY_EMOJI
+
+
+def _format_volume(volume: float) -> str:
+    if volume >= 1_000_000:
+        return f"${volume/1_000_000:.1f}M"
+    return f"${volume/1000:.0f}K"
+
+
+def _top_opportunities(
+    opportunities: List[ArbitrageOpportunity],
+    n: int = 5,
+) -> List[ArbitrageOpportunity]:
+    """Best-profit n opportunities, highest first"""
+    return heapq.nlargest(n, opportunities, key=lambda o: o.profit_estimate)
+
+
+def render_report(
+    markets: List[Market],
+    opportunities: List[ArbitrageOpportunity],
+) -> str:
+    """Market overview plus top opportunities, as one string ready to write"""
+    lines = []
+    
+    # Always show market summary
+    lines.append("📊 *Polymarket 市场速览*\n")
+    lines.append(f"扫描范围: {len(markets)} 个活跃市场 (成交量 > $10k)\n")
+    lines.append("─" * 35)
+    
+    # Show top markets by volume
+    top_markets = heapq.nlargest(10, markets, key=lambda m: m.volume)
+    
+    lines.append("\n🔥 *热门事件 TOP 10:*\n")
+    
+    for i, m in enumerate(top_markets, 1):
+        outcomes_str = " | ".join([f"{o.name}: {o.price:.1%}" for o in m.outcomes])
+        
+        lines.append(f"{i}. *{m.question}*")
+        lines.append(f"   📈 {_format_volume(m.volume)} | {outcomes_str}\n")
+    
+    # Show arbitrage opportunities if any
+    lines.append("─" * 35)
+    
+    if not opportunities:
+        lines.append(f"\n✅ 套利扫描: 暂无明显机会")
+        return "\n".join(lines) + "\n"
+    
+    # Found opportunities
+    lines.append(f"\n🔍 *发现 {len(opportunities)} 个套利机会:*\n")
+    
+    for i, opp in enumerate(_top_opportunities(opportunities), 1):
+        emoji = OPPORTUNITY_EMOJI.get(opp.type, "🎯")
+        
+        lines.append(f"{i}. {emoji} *{opp.type.value}*")
+        lines.append(f"   预估收益: *{opp.profit_estimate:.2%}*")
+        lines.append(f"   {opp.markets[0].question[:60]}...")
+        
+        # Show outcome prices
+        for o in opp.markets[0].outcomes[:3]:
+            lines.append(f"   • {o.name}: {o.price:.2%}")
+        lines.append("")
+    
+    if len(opportunities) > 5:
+        lines.append(f"... 还有 {len(opportunities) - 5} 个机会")
+    
+    return "\n".join(lines) + "\n"
+
+
+def render_summary(
+    markets: List[Market],
+    opportunities: List[ArbitrageOpportunity],
+) -> str:
+    """Short scan summary returned by the system event handler"""
+    if not opportunities:
+        return f"✅ 扫描完成: 检查了 {len(markets)} 个市场，未发现套利机会"
+    
+    parts = [
+        "🔍 *Polymarket 套利扫描*\n",
+        f"扫描市场: {len(markets)}\n",
+        f"发现机会: {len(opportunities)}\n\n",
+    ]
+    
+    for i, opp in enumerate(_top_opportunities(opportunities), 1):
+        parts.append(f"{i}. *{opp.type.value}*\n")
+        parts.append(f"   预估收益: {opp.profit_estimate:.2%}\n")
+        parts.append(f"   {opp.markets[0].question[:50]}...\n\n")
+    
+    return "".join(parts)